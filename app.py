@@ -1,9 +1,17 @@
 import streamlit as st
 import json
+import re
 import os
 from datetime import datetime
 import time
 import io
+import hashlib
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import RerunException, StopException, add_script_run_ctx, get_script_run_ctx
+
+from framework import FRAMEWORK_MD
 
 # Set page configuration
 st.set_page_config(
@@ -13,7 +21,8 @@ st.set_page_config(
 )
 
 # Function to read the default heuristics model
-@st.cache_data
+# Cached as a resource so every run shares the same string instead of a copy
+@st.cache_resource
 def load_default_heuristics():
     try:
         with open('spinelli_heuristics_model', 'r') as f:
@@ -33,62 +42,59 @@ def load_default_heuristics():
             ]
         })
 
-# Define the evaluation framework
-evaluation_framework = {
-    "dimensions": [
-        {
-            "name": "Market Opportunity Assessment",
-            "criteria": [
-                "Market Demand Extrapolation: Evaluating potential demand across geographic regions",
-                "Untapped Market Opportunity Recognition: Identifying underserved market segments",
-                "Scale Velocity Imperative: Assessing the need for rapid scaling in replicable business models"
-            ]
-        },
-        {
-            "name": "Value Creation & Brand Positioning",
-            "criteria": [
-                "Value Cluster Analysis: Understanding the 3D relationships with stakeholders",
-                "Community Business Model: Evaluating relationship-building vs. transaction-focused approaches",
-                "Brand Promise Execution Discipline: Assessing commitment to delivering core value proposition"
-            ]
-        },
-        {
-            "name": "Operational Excellence & Knowledge Transfer",
-            "criteria": [
-                "Systematic Knowledge Capture: Evaluating documentation of processes and operational insights",
-                "Network Innovation Acceleration: Assessing franchisee collaboration potential for innovation",
-                "Work Hard Testing Heuristic: Evaluating performance assessment and quality control systems"
-            ]
-        },
-        {
-            "name": "Financial Structure & Alignment",
-            "criteria": [
-                "Capital-Asset Alignment Principle: Matching funding sources with business needs",
-                "Fixed Cost Coverage Pricing: Analyzing pricing strategy based on cost structure",
-                "Break-Even Timeline Analysis: Evaluating time to profitability and sustainability",
-                "Harvest Planning Heuristic: Assessing long-term exit strategy potential"
-            ]
-        },
-        {
-            "name": "Leadership & Support Systems",
-            "criteria": [
-                "Partner First Mentality: Evaluating the franchise relationship as a partnership",
-                "Partnership vs. Employment Mindset: Assessing franchise owner treatment approach",
-                "Service Leadership Model: Examining accountability and support from franchisor"
-            ]
-        },
-        {
-            "name": "Adaptability & Growth Potential",
-            "criteria": [
-                "Dealing with Ambiguity Skill: Assessing how the franchise model handles uncertainty",
-                "Problem-Opportunity Conversion: Evaluating ability to turn challenges into business growth",
-                "Entrepreneurial Agility Imperative: Examining flexibility for adaptation in changing markets"
-            ]
-        }
-    ]
-}
+# Functions to load heavy dependencies once per process. st.cache_resource
+# survives script reruns, and optional backends resolve to None when missing
+# so a failed import is not retried for every file.
+@st.cache_resource(show_spinner=False)
+def _anthropic():
+    import anthropic
+    return anthropic
+
+@st.cache_resource(show_spinner=False)
+def _pypdf():
+    import PyPDF2
+    return PyPDF2
+
+@st.cache_resource(show_spinner=False)
+def _docx():
+    import docx
+    return docx
 
-# Function to extract text from different file types
+@st.cache_resource(show_spinner=False)
+def _pdfium():
+    try:
+        import pypdfium2
+        return pypdfium2
+    except ImportError:
+        return None
+
+# PDFium is not thread-safe, so every pdfium call must hold this lock. It is a
+# cached resource so all reruns, sessions and worker threads share one lock.
+@st.cache_resource(show_spinner=False)
+def _pdfium_lock():
+    return threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def _docx2txt():
+    try:
+        import docx2txt
+        return docx2txt
+    except ImportError:
+        return None
+
+# Patterns used to collapse layout whitespace left over from PDF and Word extraction
+_HORIZONTAL_WHITESPACE = re.compile(r"[ \t]+")
+_LINE_EDGE_WHITESPACE = re.compile(r" ?\n ?")
+_EXTRA_BLANK_LINES = re.compile(r"\n{3,}")
+
+# Function to normalize whitespace in extracted text to cut prompt tokens
+def normalize_whitespace(text):
+    text = _HORIZONTAL_WHITESPACE.sub(" ", text)
+    text = _LINE_EDGE_WHITESPACE.sub("\n", text)
+    return _EXTRA_BLANK_LINES.sub("\n\n", text).strip()
+
+# Function to extract text from different file types, raising RuntimeError
+# when a document cannot be read
 def extract_text_from_file(file):
     file_extension = file.name.split('.')[-1].lower()
     file_content = None
@@ -99,67 +105,84 @@ def extract_text_from_file(file):
     
     elif file_extension == 'pdf':
         try:
-            import PyPDF2
-            from io import BytesIO
-            
-            pdf_file = BytesIO(file.read())
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            pdf_bytes = file.read()
             
             text = []
-            for page_num in range(len(pdf_reader.pages)):
-                text.append(pdf_reader.pages[page_num].extract_text())
+            pdfium = _pdfium()
+            if pdfium is not None:
+                # Prefer PDFium (C++) for text extraction when it is installed
+                with _pdfium_lock():
+                    # PdfDocument is only a context manager from pypdfium2 5.0, so close it explicitly
+                    pdf = pdfium.PdfDocument(pdf_bytes)
+                    try:
+                        for page in pdf:
+                            # Release each page as we go to keep memory flat, even if extraction fails
+                            try:
+                                textpage = page.get_textpage()
+                                try:
+                                    text.append(textpage.get_text_range().replace("\r\n", "\n"))
+                                finally:
+                                    textpage.close()
+                            finally:
+                                page.close()
+                    finally:
+                        pdf.close()
+            else:
+                from io import BytesIO
+                
+                pdf_reader = _pypdf().PdfReader(BytesIO(pdf_bytes))
+                for page in pdf_reader.pages:
+                    text.append(page.extract_text())
             
-            file_content = "\n\n".join(text)
+            file_content = normalize_whitespace("\n\n".join(text))
         except Exception as e:
-            st.error(f"Error processing PDF file {file.name}: {str(e)}")
-            file_content = f"[Error extracting text from PDF: {str(e)}]"
+            raise RuntimeError(f"Error processing PDF file {file.name}: {str(e)}") from e
     
     elif file_extension in ['docx', 'doc']:
         try:
-            import docx
             from io import BytesIO
             
-            doc_file = BytesIO(file.read())
-            doc = docx.Document(doc_file)
+            doc_bytes = file.read()
             
-            text = []
-            for para in doc.paragraphs:
-                text.append(para.text)
+            docx2txt = _docx2txt()
+            if docx2txt is not None:
+                try:
+                    # docx2txt reads the document XML directly without building the full DOM
+                    file_content = docx2txt.process(BytesIO(doc_bytes))
+                except Exception:
+                    file_content = None
+            
+            if file_content is None:
+                # Fall back to python-docx if docx2txt is missing or fails
+                doc = _docx().Document(BytesIO(doc_bytes))
+                
+                text = []
+                for para in doc.paragraphs:
+                    # Skip empty paragraphs used only for spacing
+                    if para.text.strip():
+                        text.append(para.text)
+                
+                file_content = "\n".join(text)
             
-            file_content = "\n".join(text)
+            file_content = normalize_whitespace(file_content)
         except Exception as e:
-            st.error(f"Error processing Word file {file.name}: {str(e)}")
-            file_content = f"[Error extracting text from DOCX: {str(e)}]"
+            raise RuntimeError(f"Error processing Word file {file.name}: {str(e)}") from e
     
     else:
         file_content = f"[Unsupported file type: {file_extension}]"
     
     return file_content
 
-# Function to create a prompt for Claude
-def create_prompt(franchise_files, heuristics_content=None):
-    # Process franchise proposal documents
-    document_content = ""
-    for file_name, file_content in franchise_files.items():
-        document_content += f"<document>\n<source>{file_name}</source>\n<document_content>{file_content}</document_content>\n</document>\n\n"
-    
-    # Process heuristics model if provided
-    if heuristics_content:
-        heuristics_model = heuristics_content
-    else:
-        # Use default heuristics model from file
-        heuristics_model = load_default_heuristics()
-    
-    # Create the prompt for Claude
-    prompt = f"""
-<documents>
-{document_content}
-</documents>
-
-Here is a heuristics model:
-{heuristics_model}
+# Function to extract text from an uploaded file's bytes in a worker thread
+def extract_text_from_bytes(file_name, file_bytes):
+    file = io.BytesIO(file_bytes)
+    file.name = file_name
+    return extract_text_from_file(file)
 
-I want you to create a comprehensive franchise proposal evaluation based on Dr. Spinelli's heuristics framework. Please analyze the provided franchise proposal documents using the heuristics model to evaluate the franchise opportunity.
+# Static evaluation instructions, kept byte-identical across runs so the
+# heuristics + instructions prefix can be served from Anthropic's prompt cache
+_STATIC_PROMPT_SUFFIX = """
+I want you to create a comprehensive franchise proposal evaluation based on Dr. Spinelli's heuristics framework. Please analyze the franchise proposal documents provided below using the heuristics model to evaluate the franchise opportunity.
 
 Your evaluation should include:
 
@@ -224,13 +247,253 @@ Please structure your response in the following format:
 4. [Recommendation 4]
 5. [Recommendation 5]
 """
+
+# Maximum number of tokens Claude may generate for an evaluation
+MAX_TOKENS = 4000
+
+# Function to build the cacheable prompt block (heuristics model and instructions)
+def create_static_prompt(heuristics_model):
+    return f"Here is a heuristics model:\n{heuristics_model}\n{_STATIC_PROMPT_SUFFIX}"
+
+# Function to create a prompt for Claude
+def create_prompt(franchise_files, heuristics_content=None):
+    # Process franchise proposal documents into a single text buffer
+    documents = io.StringIO()
+    documents.write("<documents>\n")
+    for file_name, file_content in franchise_files.items():
+        documents.write(f"<document>\n<source>{file_name}</source>\n<document_content>")
+        documents.write(file_content)
+        documents.write("</document_content>\n</document>\n\n")
+    documents.write("\n</documents>")
+    
+    # Process heuristics model if provided
+    if heuristics_content:
+        heuristics_model = heuristics_content
+    else:
+        # Use default heuristics model from file
+        heuristics_model = load_default_heuristics()
+    
+    # Create the prompt for Claude as content blocks: the static heuristics and
+    # instructions come first and are marked for caching, the documents follow
+    prompt = [
+        {
+            "type": "text",
+            "text": create_static_prompt(heuristics_model),
+            "cache_control": {"type": "ephemeral"}
+        },
+        {
+            "type": "text",
+            "text": documents.getvalue()
+        }
+    ]
     
     return prompt
 
+# Marks the end of a response streamed by a background thread
+_STREAM_DONE = object()
+
+# Function to read a Claude response stream on a background thread. The
+# returned generator yields text chunks from a queue; closing it (e.g. when
+# Streamlit interrupts the script) tells the worker to close the stream.
+def stream_in_background(client, **stream_kwargs):
+    chunks = queue.Queue()
+    stop = threading.Event()
+    
+    def worker():
+        try:
+            with client.messages.stream(**stream_kwargs) as stream:
+                for text in stream.text_stream:
+                    if stop.is_set():
+                        break
+                    chunks.put(text)
+        except Exception as e:
+            # Hand the error to the consuming generator to raise
+            chunks.put(e)
+        finally:
+            chunks.put(_STREAM_DONE)
+    
+    threading.Thread(target=worker, daemon=True).start()
+    
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _STREAM_DONE:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        stop.set()
+
+# Function to submit one evaluation per document to the Message Batches API
+def submit_document_batch(client, franchise_files, model):
+    # Batch custom IDs only allow letters, digits, '-' and '_', so index the files
+    file_names = list(franchise_files.keys())
+    batch = client.messages.batches.create(
+        requests=[
+            {
+                "custom_id": f"document-{i}",
+                "params": {
+                    "model": model,
+                    "max_tokens": MAX_TOKENS,
+                    "messages": [
+                        {"role": "user", "content": create_prompt({file_name: franchise_files[file_name]})}
+                    ]
+                }
+            }
+            for i, file_name in enumerate(file_names)
+        ]
+    )
+    return batch.id, file_names
+
+# Function to wait for a submitted batch and combine its evaluations
+def wait_for_document_batch(client, batch_id, file_names, status_placeholder):
+    # Poll until every request in the batch has finished
+    batch = client.messages.batches.retrieve(batch_id)
+    while batch.processing_status != "ended":
+        done = len(file_names) - batch.request_counts.processing
+        status_placeholder.text(f"Evaluating documents separately: {done} of {len(file_names)} complete")
+        time.sleep(5)
+        batch = client.messages.batches.retrieve(batch_id)
+    
+    # Collect results, they are not guaranteed to come back in request order
+    results = {}
+    all_succeeded = True
+    for entry in client.messages.batches.results(batch_id):
+        if entry.result.type == "succeeded":
+            results[entry.custom_id] = entry.result.message.content[0].text
+        elif entry.result.type == "errored":
+            all_succeeded = False
+            results[entry.custom_id] = f"[Evaluation errored: {entry.result.error.error.message}]"
+        else:
+            all_succeeded = False
+            results[entry.custom_id] = f"[Evaluation {entry.result.type}]"
+    
+    # Combine the evaluations in upload order
+    sections = []
+    for i, file_name in enumerate(file_names):
+        evaluation = results.get(f"document-{i}")
+        if evaluation is None:
+            all_succeeded = False
+            evaluation = "[No result returned]"
+        sections.append(f"*Source document: {file_name}*\n\n{evaluation}")
+    
+    return "\n\n---\n\n".join(sections), all_succeeded
+
+# Function to tell transient API failures apart from ones that will never succeed
+def is_retryable_error(error):
+    anthropic = _anthropic()
+    return isinstance(error, (anthropic.APIConnectionError, anthropic.RateLimitError, anthropic.InternalServerError))
+
+# Function to finish the batch saved in session state. The batch ID is kept
+# until its results are collected, so a rerun that interrupts polling resumes
+# it on the next run instead of orphaning the batch.
+def finish_pending_batch(client, status_placeholder):
+    pending_batch = st.session_state.pending_batch
+    try:
+        response_text, all_succeeded = wait_for_document_batch(
+            client, pending_batch["id"], pending_batch["file_names"], status_placeholder
+        )
+    except (RerunException, StopException):
+        # Keep the batch so the next run resumes polling it
+        raise
+    except Exception as e:
+        # Forget batches that can never complete (e.g. expired or deleted) so
+        # they are not polled again on every rerun
+        if not is_retryable_error(e):
+            del st.session_state.pending_batch
+        raise
+    st.session_state.raw_response = response_text
+    del st.session_state.pending_batch
+    
+    # Only cache complete results so failed evaluations are retried next time
+    if all_succeeded and pending_batch["cache_key"] is not None:
+        store_cached_completion(*pending_batch["cache_key"], response_text)
+
+# Function to memoize finished analyses by content hash, persisted to disk so
+# hits survive server restarts. _generate is excluded from the cache key.
+@st.cache_data(persist="disk", show_spinner=False, max_entries=64)
+def cached_completion(docs_hash, prompt_hash, model, max_tokens, evaluate_separately, _generate):
+    return _generate()
+
+# Function to look up a previous analysis without calling the API
+def lookup_cached_completion(docs_hash, prompt_hash, model, max_tokens, evaluate_separately):
+    def cache_miss():
+        # Raising keeps the miss from being stored in the cache
+        raise LookupError("No cached analysis")
+    
+    try:
+        return cached_completion(docs_hash, prompt_hash, model, max_tokens, evaluate_separately, cache_miss)
+    except LookupError:
+        return None
+
+# Function to store a finished analysis in the cache
+def store_cached_completion(docs_hash, prompt_hash, model, max_tokens, evaluate_separately, response_text):
+    cached_completion(docs_hash, prompt_hash, model, max_tokens, evaluate_separately, lambda: response_text)
+
+# Function to hash a single uploaded file's bytes
+def hash_file_bytes(file_bytes):
+    return hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+
+# Function to hash uploaded documents from their names and per-file hashes, in upload order
+def hash_documents(file_hashes):
+    digest = hashlib.blake2b(digest_size=16)
+    for file_name, file_hash in file_hashes:
+        digest.update(file_name.encode('utf-8') + b'\0')
+        digest.update(file_hash.encode('ascii'))
+    return digest.hexdigest()
+
 # Function to display evaluation results with formatting
 def display_evaluation_results(response_text):
     st.markdown(response_text)
 
+# Function to render the Results tab. As a fragment, interacting with its
+# download buttons reruns only this function instead of the whole app.
+@st.fragment
+def render_results():
+    if 'response_stream' in st.session_state:
+        # Render the streamed response as tokens arrive
+        response_stream = st.session_state.pop('response_stream')
+        # Only catch API errors: Streamlit's rerun/stop signals are Exceptions in
+        # this version and must propagate so widget interactions are not lost
+        anthropic = _anthropic()
+        try:
+            st.session_state.raw_response = st.write_stream(response_stream)
+        except anthropic.APIError as e:
+            st.error(f"Error calling Claude API: {str(e)}")
+            st.session_state.raw_response = None
+    elif 'raw_response' in st.session_state and st.session_state.raw_response:
+        # Display formatted evaluation results
+        display_evaluation_results(st.session_state.raw_response)
+    
+    if 'raw_response' in st.session_state and st.session_state.raw_response:
+        # Download options
+        st.header("Download Results")
+        
+        # Offer multiple download formats
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if st.download_button(
+                label="Download as Text",
+                data=st.session_state.raw_response,
+                file_name=f"franchise-evaluation-{datetime.now().strftime('%Y-%m-%d')}.txt",
+                mime="text/plain"
+            ):
+                pass
+        
+        with col2:
+            # Create a markdown version with better formatting
+            if st.download_button(
+                label="Download as Markdown",
+                data=st.session_state.raw_response,
+                file_name=f"franchise-evaluation-{datetime.now().strftime('%Y-%m-%d')}.md",
+                mime="text/markdown"
+            ):
+                pass
+    else:
+        st.info("No analysis results yet. Please upload documents and run analysis in the 'Upload & Analyze' tab.")
+
 # Main Streamlit UI
 def main():
     st.title("Franchise Proposal Evaluator")
@@ -243,10 +506,9 @@ def main():
     with tab1:
         st.header("Dr. Spinelli's Franchise Evaluation Framework")
         
-        for i, dimension in enumerate(evaluation_framework["dimensions"]):
-            with st.expander(f"{dimension['name']}", expanded=False):
-                for criterion in dimension["criteria"]:
-                    st.markdown(f"- {criterion}")
+        for dimension_name, criteria_md in FRAMEWORK_MD.items():
+            with st.expander(dimension_name, expanded=False):
+                st.markdown(criteria_md)
     
     # Tab 2: Upload & Analyze
     with tab2:
@@ -272,13 +534,32 @@ def main():
                                           accept_multiple_files=True, 
                                           type=["txt", "md", "pdf", "docx", "doc"])
         
+        # Evaluate each document on its own instead of one combined evaluation
+        evaluate_separately = st.checkbox(
+            "Evaluate each document separately",
+            value=False,
+            help="Submit one evaluation per document through the Message Batches API (lower cost, results arrive when the whole batch is done)"
+        )
+        
         # Display uploaded files
         if uploaded_files:
             st.subheader("Uploaded Files")
-            files_container = st.container()
-            with files_container:
-                for file in uploaded_files:
-                    st.text(f"📄 {file.name}")
+            # One plain-text element for the whole list, so file names are never parsed as Markdown
+            st.text("\n".join(f"📄 {file.name}" for file in uploaded_files))
+        
+        # Resume polling a batch whose run was interrupted by a rerun
+        if 'pending_batch' in st.session_state and api_key != "not_found":
+            batch_status = st.empty()
+            batch_status.text("Resuming separate document evaluation...")
+            try:
+                finish_pending_batch(_anthropic().Anthropic(api_key=api_key), batch_status)
+                batch_status.text("Analysis complete!")
+                st.info("Analysis complete! Click on the 'Results' tab to view the evaluation.")
+            except (RerunException, StopException):
+                # Let Streamlit handle widget interactions that interrupt polling
+                raise
+            except Exception as e:
+                st.error(f"Error calling Claude API: {str(e)}")
         
         # Analyze button - disable if no API key or no files
         button_disabled = not uploaded_files or api_key == "not_found"
@@ -289,128 +570,153 @@ def main():
             elif not uploaded_files:
                 st.warning("Please upload at least one franchise document")
             else:
-                # Process files
-                franchise_files = {}
+                # Read uploads on the main thread, UploadedFile is not thread-safe
+                file_data = [(file.name, file.getvalue()) for file in uploaded_files]
+                
+                # Hash each upload once so text extracted on an earlier run can be reused
+                file_hashes = [(file_name, hash_file_bytes(file_bytes)) for file_name, file_bytes in file_data]
+                # Keep only the current uploads' text so removed files do not linger in the session
+                previous_text = st.session_state.get('extracted_text', {})
+                extracted_text = {key: previous_text[key] for key in file_hashes if key in previous_text}
+                st.session_state.extracted_text = extracted_text
+                extracted = dict(extracted_text)
+                pending = [
+                    (file_name, file_bytes, file_hash)
+                    for (file_name, file_bytes), (_, file_hash) in zip(file_data, file_hashes)
+                    if (file_name, file_hash) not in extracted
+                ]
                 
                 # Create progress bar for file processing
                 file_progress = st.progress(0)
                 file_status = st.empty()
+                processed = len(file_data) - len(pending)
+                extraction_failed = False
+                file_progress.progress(processed / len(file_data))
                 
-                # Process each file
-                for i, file in enumerate(uploaded_files):
-                    file_status.text(f"Processing file {i+1} of {len(uploaded_files)}: {file.name}")
-                    
-                    # Extract text from file
-                    file_content = extract_text_from_file(file)
-                    
-                    # Add to files dictionary
-                    franchise_files[file.name] = file_content
-                    
-                    # Update progress
-                    file_progress.progress((i+1) / len(uploaded_files))
+                # Extract text from the remaining files in parallel, attaching the
+                # script context so the cached loaders can be used from worker threads
+                if pending:
+                    ctx = get_script_run_ctx()
+                    with ThreadPoolExecutor(
+                        max_workers=min(8, len(pending)),
+                        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+                    ) as executor:
+                        futures = {
+                            executor.submit(extract_text_from_bytes, file_name, file_bytes): (file_name, file_hash)
+                            for file_name, file_bytes, file_hash in pending
+                        }
+                        for future in as_completed(futures):
+                            try:
+                                file_content = future.result()
+                            except Exception as e:
+                                # Report the failure and send a placeholder, without caching it so it is retried
+                                st.error(str(e))
+                                extracted[futures[future]] = f"[{str(e)}]"
+                                extraction_failed = True
+                            else:
+                                extracted[futures[future]] = file_content
+                                extracted_text[futures[future]] = file_content
+                            
+                            # Update progress
+                            processed += 1
+                            file_status.text(f"Processed file {processed} of {len(file_data)}: {futures[future][0]}")
+                            file_progress.progress(processed / len(file_data))
                 
-                file_status.text("All files processed successfully")
+                # Keep the documents in upload order
+                franchise_files = {file_name: extracted[(file_name, file_hash)] for file_name, file_hash in file_hashes}
                 
-                # Create progress bar for analysis
-                progress_bar = st.progress(0)
+                file_status.text("All files processed successfully")
                 
                 # Create placeholder for status
                 status_placeholder = st.empty()
                 status_placeholder.text("Preparing documents for analysis...")
-                progress_bar.progress(10)
                 
-                # Load default heuristics model
-                heuristics_content = load_default_heuristics()
+                # Clear any previous results before starting a new analysis
+                st.session_state.raw_response = None
+                st.session_state.pop('response_stream', None)
                 
-                # Generate prompt
-                prompt = create_prompt(franchise_files, heuristics_content)
-                progress_bar.progress(30)
-                status_placeholder.text("Analyzing with Claude API...")
+                # Reuse a previous analysis of the same documents, prompt and model settings
+                docs_hash = hash_documents(file_hashes)
+                prompt_hash = hashlib.blake2b(
+                    create_static_prompt(load_default_heuristics()).encode('utf-8'), digest_size=16
+                ).hexdigest()
+                cache_key = (docs_hash, prompt_hash, selected_model, MAX_TOKENS, evaluate_separately)
+                cached_response = lookup_cached_completion(*cache_key)
                 
-                # Call Claude API with selected model
-                try:
-                    # Import anthropic here directly
-                    import anthropic
+                # An analysis of error placeholders must not be cached under the raw file hashes
+                store_key = None if extraction_failed else cache_key
+                
+                if cached_response:
+                    st.session_state.raw_response = cached_response
+                    status_placeholder.text("Loaded a previous analysis of these documents")
+                    st.info("Analysis complete! Click on the 'Results' tab to view the evaluation.")
+                else:
+                    # Generate prompt (falls back to the default heuristics model)
+                    prompt = create_prompt(franchise_files)
+                    status_placeholder.text("Analyzing with Claude API...")
                     
-                    # Try the older Client approach first (pre-1.0)
+                    # Call Claude API with selected model
                     try:
-                        # Check if the older Client class exists
-                        if hasattr(anthropic, 'Client'):
-                            client = anthropic.Client(api_key=api_key)
+                        # Load anthropic (imported once per process)
+                        anthropic = _anthropic()
+                        
+                        # The messages, streaming and batches APIs used here need anthropic>=0.41
+                        client = anthropic.Anthropic(api_key=api_key)
+                        
+                        if evaluate_separately:
+                            # Evaluate every document in its own request via the batch API
+                            status_placeholder.text("Submitting documents for separate evaluation...")
+                            batch_id, file_names = submit_document_batch(client, franchise_files, selected_model)
                             
-                            # Use the selected model with older API format
-                            constants_exist = hasattr(anthropic, 'HUMAN_PROMPT') and hasattr(anthropic, 'AI_PROMPT')
-                            if constants_exist:
-                                response = client.completion(
-                                    prompt=f"{anthropic.HUMAN_PROMPT} {prompt} {anthropic.AI_PROMPT}",
+                            # Remember the batch right away so polling can resume after a rerun
+                            st.session_state.pending_batch = {
+                                "id": batch_id,
+                                "file_names": file_names,
+                                "cache_key": store_key
+                            }
+                            finish_pending_batch(client, status_placeholder)
+                        else:
+                            # Stream the response so the Results tab can render tokens as they arrive
+                            def stream_response():
+                                chunks = []
+                                for text in stream_in_background(
+                                    client,
                                     model=selected_model,
-                                    max_tokens_to_sample=4000,
-                                )
-                                message_content = response['completion']
-                            else:
-                                st.error("Anthropic library version mismatch. Missing constants.")
-                                raise Exception("Anthropic library version mismatch")
+                                    max_tokens=MAX_TOKENS,
+                                    messages=[
+                                        {"role": "user", "content": prompt}
+                                    ]
+                                ):
+                                    chunks.append(text)
+                                    yield text
+                                
+                                # Cache the analysis once the full response has arrived
+                                if store_key is not None:
+                                    store_cached_completion(*store_key, "".join(chunks))
+                            
+                            # Store the generator in session state, it is consumed in the Results tab
+                            st.session_state.response_stream = stream_response()
+                        
+                        if 'response_stream' in st.session_state:
+                            status_placeholder.text("Analysis started!")
+                            
+                            # Point the user to the results tab
+                            st.info("Analysis started! Click on the 'Results' tab to view the evaluation.")
                         else:
-                            raise AttributeError("Client class not found, trying newer API")
-                    except (AttributeError, TypeError):
-                        # For newer versions (1.0+)
-                        client = anthropic.Anthropic(api_key=api_key)
+                            status_placeholder.text("Analysis complete!")
+                            
+                            # Point the user to the results tab
+                            st.info("Analysis complete! Click on the 'Results' tab to view the evaluation.")
                         
-                        # Use the selected model
-                        message = client.messages.create(
-                            model=selected_model,
-                            max_tokens=4000,
-                            messages=[
-                                {"role": "user", "content": prompt}
-                            ]
-                        )
-                        message_content = message.content[0].text
-                    # Store raw response in session state
-                    st.session_state.raw_response = message_content
-                    
-                    # Update progress and status
-                    progress_bar.progress(100)
-                    status_placeholder.text("Analysis complete!")
-                    
-                    # Automatically switch to results tab
-                    st.info("Analysis complete! Click on the 'Results' tab to view the evaluation.")
-                    
-                except Exception as e:
-                    st.error(f"Error calling Claude API: {str(e)}")
-                    progress_bar.progress(100)
+                    except (RerunException, StopException):
+                        # Let Streamlit handle widget interactions that interrupt the analysis
+                        raise
+                    except Exception as e:
+                        st.error(f"Error calling Claude API: {str(e)}")
     
     # Tab 3: Results
     with tab3:
-        if 'raw_response' in st.session_state and st.session_state.raw_response:
-            # Display formatted evaluation results
-            display_evaluation_results(st.session_state.raw_response)
-            
-            # Download options
-            st.header("Download Results")
-            
-            # Offer multiple download formats
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if st.download_button(
-                    label="Download as Text",
-                    data=st.session_state.raw_response,
-                    file_name=f"franchise-evaluation-{datetime.now().strftime('%Y-%m-%d')}.txt",
-                    mime="text/plain"
-                ):
-                    pass
-            
-            with col2:
-                # Create a markdown version with better formatting
-                if st.download_button(
-                    label="Download as Markdown",
-                    data=st.session_state.raw_response,
-                    file_name=f"franchise-evaluation-{datetime.now().strftime('%Y-%m-%d')}.md",
-                    mime="text/markdown"
-                ):
-                    pass
-        else:
-            st.info("No analysis results yet. Please upload documents and run analysis in the 'Upload & Analyze' tab.")
+        render_results()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,73 @@
+# Dr. Spinelli's franchise evaluation framework.
+# Streamlit reruns app.py on every interaction, but imported modules are only
+# executed once per process, so these read-only structures are built once.
+from types import MappingProxyType
+
+# Function to recursively freeze dicts and lists into read-only equivalents
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+# Define the evaluation framework (read-only)
+evaluation_framework = _freeze({
+    "dimensions": [
+        {
+            "name": "Market Opportunity Assessment",
+            "criteria": [
+                "Market Demand Extrapolation: Evaluating potential demand across geographic regions",
+                "Untapped Market Opportunity Recognition: Identifying underserved market segments",
+                "Scale Velocity Imperative: Assessing the need for rapid scaling in replicable business models"
+            ]
+        },
+        {
+            "name": "Value Creation & Brand Positioning",
+            "criteria": [
+                "Value Cluster Analysis: Understanding the 3D relationships with stakeholders",
+                "Community Business Model: Evaluating relationship-building vs. transaction-focused approaches",
+                "Brand Promise Execution Discipline: Assessing commitment to delivering core value proposition"
+            ]
+        },
+        {
+            "name": "Operational Excellence & Knowledge Transfer",
+            "criteria": [
+                "Systematic Knowledge Capture: Evaluating documentation of processes and operational insights",
+                "Network Innovation Acceleration: Assessing franchisee collaboration potential for innovation",
+                "Work Hard Testing Heuristic: Evaluating performance assessment and quality control systems"
+            ]
+        },
+        {
+            "name": "Financial Structure & Alignment",
+            "criteria": [
+                "Capital-Asset Alignment Principle: Matching funding sources with business needs",
+                "Fixed Cost Coverage Pricing: Analyzing pricing strategy based on cost structure",
+                "Break-Even Timeline Analysis: Evaluating time to profitability and sustainability",
+                "Harvest Planning Heuristic: Assessing long-term exit strategy potential"
+            ]
+        },
+        {
+            "name": "Leadership & Support Systems",
+            "criteria": [
+                "Partner First Mentality: Evaluating the franchise relationship as a partnership",
+                "Partnership vs. Employment Mindset: Assessing franchise owner treatment approach",
+                "Service Leadership Model: Examining accountability and support from franchisor"
+            ]
+        },
+        {
+            "name": "Adaptability & Growth Potential",
+            "criteria": [
+                "Dealing with Ambiguity Skill: Assessing how the franchise model handles uncertainty",
+                "Problem-Opportunity Conversion: Evaluating ability to turn challenges into business growth",
+                "Entrepreneurial Agility Imperative: Examining flexibility for adaptation in changing markets"
+            ]
+        }
+    ]
+})
+
+# Markdown criteria list for each framework dimension
+FRAMEWORK_MD = MappingProxyType({
+    dimension["name"]: "\n".join(f"- {criterion}" for criterion in dimension["criteria"])
+    for dimension in evaluation_framework["dimensions"]
+})